@@ -1,33 +1,129 @@
-import yaml
+import atexit
+import copy
+import dataclasses
+import errno
+import functools
+import hashlib
 import subprocess
 import os
+import queue
+import shlex
+import shutil
+import sys
 import threading
 import time
 import concurrent.futures
 import click
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 
 CONFIG_FILE = "/app/config.yaml"  # Mounted YAML config file
 
+# Process-lifetime pool for jobs, so threads are reused across builds. Kept separate from the
+# task pool: a job blocks on its stage's tasks, which must never wait behind other jobs.
+_JOB_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 4) * 4), thread_name_prefix="infracycle"
+)
+# Shared pool for the independent tasks of a stage
+_TASK_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 4) * 4), thread_name_prefix="infracycle-task"
+)
+_SKIPPED = object()  # Result of a task that never started because its stage was cancelled
+# Guards the build summary: tasks of a wave, the jobs of a build and the mail thread all record into it
+_SUMMARY_LOCK = threading.Lock()
+
+def _count(summary, key, n=1):
+    """Add n to a summary counter; safe to call from any thread."""
+    with _SUMMARY_LOCK:
+        summary[key] += n
+
+# Parsed config trees: path -> ((path, mtime_ns, size), tree). One entry per path, which a
+# rewritten file replaces, like the on-disk cache.
+_YAML_CACHE = {}
+# The agent's on-disk cache. Pickled copies of those trees live at its top level, so a rerun on an
+# unchanged config skips YAML parsing; local BuildKit layer caches live under buildx/.
+_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "infracycle")
+
+def _load_cached_config(key, file):
+    """
+    Return the parsed config for key from the on-disk cache, parsing file and caching it on a miss.
+
+    Each config path has a single cache file whose first record is the (path, mtime_ns, size)
+    key it was parsed from, so an outdated entry is detected before its tree is unpickled
+    and is then overwritten rather than left behind.
+    """
+    import pickle
+
+    cache_path = os.path.join(_CACHE_DIR, hashlib.sha1(key[0].encode()).hexdigest() + ".pkl")
+    try:
+        with open(cache_path, "rb") as cached:
+            if pickle.load(cached) == key:
+                return pickle.load(cached)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        pass
+
+    import yaml  # Imported here so that only runs which parse a config pay for it
+
+    # Prefer libyaml's C loader (needs PyYAML built against libyaml-dev); fall back to the pure-Python loader.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    config = yaml.load(file, Loader=loader)
+
+    # Write to a temporary file and rename it into place, so concurrent runs never read half a pickle
+    import tempfile
+
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            pickle.dump(key, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(config, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # An unwritable cache only costs the next run a parse
+    return config
+
 def load_yaml_config():
     """Load the YAML configuration file."""
-    if not os.path.exists(CONFIG_FILE):
+    try:
+        file = open(CONFIG_FILE, "rb")
+    except FileNotFoundError:
         print("❌ No configuration file found!")
         return None
 
-    with open(CONFIG_FILE, "r") as file:
-        return yaml.safe_load(file)
-
-
-def execute_build_stages(jobs_or_stages, is_jobs=False):
+    with file:
+        # Key the cache on the opened file itself, so there is no window between check and read
+        st = os.fstat(file.fileno())
+        key = (CONFIG_FILE, st.st_mtime_ns, st.st_size)
+        entry = _YAML_CACHE.get(CONFIG_FILE)
+        if entry is None or entry[0] != key:
+            entry = _YAML_CACHE[CONFIG_FILE] = (key, _load_cached_config(key, file))
+
+    # Hand out a copy so callers can't mutate the cached tree
+    return copy.deepcopy(entry[1])
+
+# Build header boxes, each printed with a single write
+_START_HEADER = (
+    "=" * 43 + "\n"
+    "|" + " " * 41 + "|\n"
+    "|      DEVOPS-BOT INFRACYCLE BUILD STARTED       |\n"
+    "|" + " " * 41 + "|\n" +
+    "=" * 43 + "\n"
+    "\n"
+    ">> 🚀 Initializing DevOps-Bot..."
+)
+_DONE_HEADER = (
+    "=" * 43 + "\n"
+    "|      DEVOPS-BOT INFRACYCLE BUILD COMPLETED        |\n" +
+    "=" * 43
+)
+
+def execute_build_stages(jobs_or_stages, is_jobs=False, use_processes=False):
     """
     Execute all stages or jobs of the build process in a single execution context.
 
     Args:
         jobs_or_stages (list): List of job or stage configurations.
         is_jobs (bool): True if processing multiple jobs; False if processing stages.
+        use_processes (bool): Run jobs in worker processes instead of threads. Worker
+            processes have no stdin, so approval requests cannot be answered there.
 
     Returns:
         None
@@ -35,309 +131,455 @@ def execute_build_stages(jobs_or_stages, is_jobs=False):
     summary = {"completed": 0, "failed": 0, "uploaded": 0}
 
     # Display unified build start header
-    print("=" * 43)
-    print("|" + " " * 41 + "|")
-    print("|      DEVOPS-BOT INFRACYCLE BUILD STARTED       |")
-    print("|" + " " * 41 + "|")
-    print("=" * 43)
-    print("")
-
-    def simulate_build_progress():
-        steps = [
-            "🚀 Initializing DevOps-Bot...",
-        ]
-        for step in steps:
-            print(f">> {step}")
-
-    # Start the simulation in a separate thread
-    simulation_thread = threading.Thread(target=simulate_build_progress)
-    simulation_thread.start()
-
-    # Helper function to process a single stage or job
-    def process_single_item(item):
-        stages = item.get("stages", []) if is_jobs else [item]
-        for stage in stages:
-            stage_name = stage.get("name", "Unnamed Stage")
-            tasks = stage.get("tasks", {})
-            ignore_failure = stage.get("ignore_failure", False)  # Default to False
+    print(_START_HEADER)
 
-            click.echo(f"[INFO] ***************** Started stage: {stage_name} *********************\n")
+    # Execute jobs or stages
+    if is_jobs:
+        click.echo(f"Executing {len(jobs_or_stages)} jobs in parallel...\n")
+        if use_processes:
+            # Workers are spawned on demand; each returns its own summary so no state is shared
+            workers = min(len(jobs_or_stages), os.cpu_count() or 1)
+            import multiprocessing
+
+            context = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [executor.submit(_process_job_isolated, job) for job in jobs_or_stages]
+                for job, future in zip(jobs_or_stages, futures):
+                    try:
+                        job_summary = future.result()
+                    except concurrent.futures.process.BrokenProcessPool:
+                        # A worker died (OOM killer, signal); the jobs it took down with it failed
+                        click.echo(click.style(
+                            f"❌ Job '{_job_name(job)}' was lost: its worker process exited abruptly.", fg="red"))
+                        _count(summary, "failed")
+                        continue
+                    except Exception as e:
+                        click.echo(click.style(f"❌ Error during job '{_job_name(job)}': {str(e)}", fg="red"))
+                        _count(summary, "failed")
+                        continue
+                    for key, count in job_summary.items():
+                        _count(summary, key, count)
+        else:
+            futures = [_JOB_POOL.submit(process_single_item, job, True, summary) for job in jobs_or_stages]
+            for job, future in zip(jobs_or_stages, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    click.echo(click.style(f"❌ Error during job '{_job_name(job)}': {str(e)}", fg="red"))
+                    _count(summary, "failed")
+    else:
+        click.echo(f"Executing {len(jobs_or_stages)} stages sequentially...\n")
+        try:
+            ordered_stages = _order_stages(jobs_or_stages)
+        except ValueError as e:
+            click.echo(click.style(f"❌ {e}", fg="red"))
+            _count(summary, "failed")
+            ordered_stages = []
+        shells = {}  # Sequential stages form one session, like the stages of a job
+        try:
+            for stage in ordered_stages:
+                process_single_item(stage, False, summary, shells)
+        finally:
+            _close_shells(shells)
+
+    _flush_notifications()
+    click.echo(f"Build process completed. Summary: {summary}")
+    print(_DONE_HEADER)
+
+def process_single_item(item, is_jobs, summary, shells=None):
+    """
+    Run a job (all of its stages) or a single stage.
+
+    Args:
+        item (dict): A job or stage configuration.
+        is_jobs (bool): True if item is a job; False if it is a stage.
+        summary (dict): A dictionary to track the task results.
+        shells (dict): Shell session to run shell steps in; by default the item gets its own.
 
+    Returns:
+        None
+    """
+    if is_jobs:
+        try:
+            stages = _order_stages(item.get("stages", []))
+        except ValueError as e:
+            click.echo(click.style(f"❌ {e}", fg="red"))
+            _count(summary, "failed")
+            return
+    else:
+        stages = [item]
+
+    # Shell steps of all these stages share one sh and one bash process, unless the caller owns the session
+    owns_shells = shells is None
+    if owns_shells:
+        shells = {}
+    try:
+        clone_dir = None
+        for stage in stages:
+            stage_name = stage.get("name", "Unnamed Stage") if isinstance(stage, dict) else "Unnamed Stage"
             try:
-                # Setup and Clone
-                if tasks.get("setup_and_clone", {}).get("enabled", False):
-                    click.echo("📢 Setup and cloning are enabled in the configuration.")
-                    click.echo("**************************** SETUP AND CLONING ENABLED *******************************")
-                    clone_dir = setup_and_clone_repository(tasks.get("setup_and_clone", {}), summary)
-                    if clone_dir:
-                        click.echo("*********************** SETUP AND CLONING COMPLETED SUCCESSFULLY **************************")
+                tasks = stage.get("tasks") or {}
+                ignore_failure = stage.get("ignore_failure", False)  # Default to False
+
+                click.echo(f"[INFO] ***************** Started stage: {stage_name} *********************\n")
+
+                # One pass over the stage's tasks instead of per-registry-entry lookups
+                enabled = {key: cfg for key, cfg in tasks.items() if _is_enabled(cfg)}
+                selected = {
+                    key: (fn, label, meta, enabled[key])
+                    for key, fn, label, meta in TASKS
+                    if key in enabled
+                }
+                cancel = threading.Event()
+
+                try:
+                    waves = _topo_waves(list(selected), _task_dependencies(selected))
+                except ValueError as e:
+                    click.echo(click.style(f"❌ Stage '{stage_name}': {e}", fg="red"))
+                    _count(summary, "failed")
+                    return
+
+                # Independent tasks of a wave run side by side; the next wave waits for all of them
+                for wave in waves:
+                    run = lambda key: _run_task(selected[key], clone_dir, stage_name, shells, summary, ignore_failure, cancel)
+                    if len(wave) == 1:
+                        results = [run(wave[0])]
                     else:
-                        click.echo(click.style("*********************** SETUP AND CLONING FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # Docker Build
-                if tasks.get("docker_build", {}).get("enabled", False):
-                    click.echo("🐳 Docker build is enabled in the configuration.")
-                    click.echo("************************ DOCKER BUILD ENABLED *******************************")
-
-                    result = docker_build(tasks.get("docker_build", {}), clone_dir, summary)
-                    if result:
-                        click.echo("✅ *********************** DOCKER BUILD COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** DOCKER BUILD FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # Docker Hub Push
-                if tasks.get("docker_hub", {}).get("enabled", False):
-                    click.echo("************************ DOCKER HUB PROCESS ENABLED *******************************")
-
-                    result = push_to_docker_hub(
-                        tasks.get("docker_hub", {}),
-                        summary=summary
-                    )
-
-                    if result:
-                        click.echo("✅ ************************ DOCKER HUB PROCESS COMPLETED *******************************")
-                    else:
-                        click.echo(click.style("❌ ************************ DOCKER HUB PROCESS FAILED *******************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
+                        results = list(_TASK_POOL.map(run, wave))
+
+                    stop = False
+                    for key, result in zip(wave, results):
+                        if result is _SKIPPED:
+                            continue
+                        fn, label, meta, task_config = selected[key]
+                        if meta.get("returns_clone_dir"):
+                            clone_dir = result
+                        if not _report(label, result, summary, ignore_failure, stage_name):
+                            stop = True
+                    if stop:
+                        return
+            except Exception as e:
+                click.echo(click.style(f"❌ Error during stage '{stage_name}': {str(e)}", fg="red"))
+                _count(summary, "failed")
 
-                # Shell Script Execution
-                if tasks.get("sh", {}).get("enabled", False):
-                    click.echo("************************ SHELL SCRIPT EXECUTION ENABLED *******************************")
+            click.echo(f"[INFO] ***************** Completed stage: {stage_name} *********************\n")
+    finally:
+        if owns_shells:
+            _close_shells(shells)
 
-                    result = run_shell_steps(tasks.get("sh", {}), summary)
+def _job_name(job):
+    """Name of a job for error messages, whatever shape its configuration has."""
+    return job.get("name", "Unnamed Job") if isinstance(job, dict) else "Unnamed Job"
 
-                    if result:
-                        click.echo("✅ *********************** SHELL SCRIPTS COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** SHELL SCRIPTS FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
+def _is_enabled(task_config):
+    """Tell whether a task's configuration, raw or prepared by prepare_configs, turns it on."""
+    if isinstance(task_config, dict):
+        return bool(task_config.get("enabled"))
+    return getattr(task_config, "enabled", False)
 
-                # Bash Script Execution
-                if tasks.get("bash", {}).get("enabled", False):
-                    click.echo("************************ BASH SCRIPT EXECUTION ENABLED *******************************")
+def _process_job_isolated(job):
+    """
+    Run one job in a worker process and return its own summary for the parent to merge.
+    """
+    summary = {"completed": 0, "failed": 0, "uploaded": 0}
+    process_single_item(job, True, summary)
+    _flush_notifications()  # The job's mail is counted in the summary it hands back
+    return summary
 
-                    result = run_bash_steps(tasks.get("bash", {}), summary)
+def _run_task(entry, clone_dir, stage_name, shells, summary, ignore_failure, cancel):
+    """
+    Run one registry task, returning its result or _SKIPPED if the stage was cancelled first.
+    """
+    fn, label, meta, task_config = entry
+    if cancel.is_set():
+        return _SKIPPED
 
-                    if result:
-                        click.echo("✅ *********************** BASH STEPS COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** BASH STEPS FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # Maven Build
-                if tasks.get("maven", {}).get("enabled", False):
-                    click.echo("📢 Maven build is enabled in the configuration.")
-                    click.echo("************************ MAVEN BUILD ENABLED *******************************")
-
-                    result = run_maven_build(tasks.get("maven", {}), clone_dir, summary)
-
-                    if result:
-                        click.echo("✅ *********************** MAVEN BUILD COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** MAVEN BUILD FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
+    click.echo(_ENABLED_BANNERS[label])
+    try:
+        args = [task_config]
+        if meta.get("needs_clone_dir"):
+            args.append(clone_dir)
+        if meta.get("needs_stage_name"):
+            args.append(stage_name)
+        if meta.get("needs_shells"):
+            args.append(shells)
+        result = fn(*args, summary)
+    except Exception as e:
+        click.echo(click.style(f"❌ Error during {label.lower()}: {str(e)}", fg="red"))
+        result = None
 
-                # Send Email Notification
-                if tasks.get("send_notification", {}).get("enabled", False):
-                    click.echo("************************ EMAIL NOTIFICATION ENABLED *******************************")
+    if not result and not ignore_failure:
+        cancel.set()
+    return result
 
-                    try:
-                        result = notify_on_task_completion(
-                            tasks.get("send_notification", {}).get("task_name", stage_name),
-                            tasks.get("send_notification", {}).get("status", "success"),
-                            tasks.get("send_notification", {}).get("recipients", []),
-                            tasks.get("send_notification", {}).get("email_config", {})
-                        )
-
-                        if result:
-                            click.echo("✅ ************************ EMAIL NOTIFICATION SENT *******************************")
-                            summary["completed"] += 1  # Increment completed for successful notification
-                        else:
-                            click.echo(click.style("❌ ************************ EMAIL NOTIFICATION FAILED *******************************", fg="red"))
-                            summary["failed"] += 1
-                            if not ignore_failure:
-                                click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                                return
-                    except Exception as e:
-                        click.echo(click.style(f"❌ Error during notification: {str(e)}", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            return
+def _task_dependencies(selected):
+    """
+    Derive task-to-task dependencies from the resources each task requires and produces.
 
-                # Gradle Build
-                if tasks.get("gradle", {}).get("enabled", False):
-                    click.echo("📢 Gradle build is enabled in the configuration.")
-                    click.echo("************************ GRADLE BUILD ENABLED *******************************")
+    A required resource that no selected task produces is assumed to be available already.
+    A task that requires and produces the same resource changes it in place, so it waits for
+    the producers of that resource that come before it in the registry and not for later ones.
+    A task whose config lists `needs` (task keys) waits for exactly those tasks instead,
+    which lets users run tasks side by side that the registry would order.
 
-                    result = run_gradle_build(tasks.get("gradle", {}), clone_dir, summary)
+    Args:
+        selected (dict): Enabled tasks of a stage, keyed by config key.
 
-                    if result:
-                        click.echo("✅ *********************** GRADLE BUILD COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** GRADLE BUILD FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # Trivy Scanning
-                if tasks.get("trivy", {}).get("enabled", False):
-                    click.echo("📢 Trivy scanning is enabled in the configuration.")
-                    click.echo("************************ TRIVY SCANNING ENABLED *******************************")
-
-                    result = run_trivy_scan(tasks.get("trivy", {}), summary)
-
-                    if result:
-                        click.echo("✅ *********************** TRIVY SCANNING COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** TRIVY SCANNING FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # Yarn Build
-                if tasks.get("yarn", {}).get("enabled", False):
-                    click.echo("📢 Yarn build is enabled in the configuration.")
-                    click.echo("************************ YARN BUILD ENABLED *******************************")
-
-                    result = run_yarn_build(tasks.get("yarn", {}), clone_dir, summary)
-
-                    if result:
-                        click.echo("✅ *********************** YARN BUILD COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** YARN BUILD FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # Go Build
-                if tasks.get("go_build", {}).get("enabled", False):
-                    click.echo("📢 Go Modules build is enabled in the configuration.")
-                    click.echo("************************ GO BUILD ENABLED *******************************")
-
-                    result = run_go_build(tasks.get("go_build", {}), clone_dir, summary)
-
-                    if result:
-                        click.echo("✅ *********************** GO BUILD COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** GO BUILD FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # NPM Build
-                if tasks.get("npm", {}).get("enabled", False):
-                    click.echo("📢 NPM build is enabled in the configuration.")
-                    click.echo("************************ NPM BUILD ENABLED *******************************")
-
-                    result = run_npm_build(tasks.get("npm", {}), clone_dir, summary)
-
-                    if result:
-                        click.echo("✅ *********************** NPM BUILD COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** NPM BUILD FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
-
-                # SonarQube Analysis
-                if tasks.get("sonarqube_analysis", {}).get("enabled", False):
-                    click.echo("📢 SonarQube analysis is enabled in the configuration.")
-                    click.echo("************************ SONARQUBE ANALYSIS ENABLED *******************************")
-
-                    result = run_sonar_analysis(tasks.get("sonarqube_analysis", {}), clone_dir, summary)
-
-                    if result:
-                        click.echo("✅ *********************** SONARQUBE ANALYSIS COMPLETED SUCCESSFULLY **************************")
-                    else:
-                        click.echo(click.style("❌ *********************** SONARQUBE ANALYSIS FAILED **************************", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
-                            return
-                    click.echo("")
+    Returns:
+        dict: Maps each task key to the set of task keys it has to wait for.
 
-                # Request Approval
-                if tasks.get("request_approval", {}).get("enabled", False):
-                    click.echo("************************ APPROVAL REQUEST ENABLED *******************************")
+    Raises:
+        ValueError: If a `needs` entry is not a task key at all, e.g. a typo.
+    """
+    producers = {}
+    for key, (_, _, meta, _) in selected.items():
+        for resource in meta.get("produces", ()):
+            producers.setdefault(resource, []).append(key)  # Registry order
+
+    dependencies = {}
+    for key, (_, _, meta, task_config) in selected.items():
+        needs = _task_needs(task_config)
+        if needs is None:
+            waits_for = set()
+            for resource in meta.get("requires", ()):
+                resource_producers = producers.get(resource, [])
+                if resource in meta.get("produces", ()):
+                    # Tasks that change a resource take turns, in registry order
+                    resource_producers = resource_producers[:resource_producers.index(key)]
+                waits_for.update(resource_producers)
+        else:
+            unknown = [need for need in needs if need not in _TASK_KEYS]
+            if unknown:
+                raise ValueError(f"Task '{key}' needs unknown task(s): {', '.join(map(str, unknown))}")
+            waits_for = {need for need in needs if need in selected}  # Tasks not in this stage are already done
+        dependencies[key] = waits_for - {key}
+    return dependencies
+
+def _task_needs(task_config):
+    """Return the task keys a task's config says it needs, or None if it doesn't say."""
+    if isinstance(task_config, dict):
+        needs = task_config.get("needs")
+    else:
+        needs = getattr(task_config, "needs", None)
+    if needs is None:
+        return None
+    return (needs,) if isinstance(needs, str) else tuple(needs)
 
-                    try:
-                        approved = request_approval(tasks.get("request_approval", {}).get("task_name", stage_name))
-                        if approved:
-                            click.echo("✅ ************************ APPROVAL GRANTED *******************************")
-                            summary["completed"] += 1
-                        else:
-                            click.echo(click.style("❌ ************************ APPROVAL DENIED *******************************", fg="red"))
-                            summary["failed"] += 1
-                            if not ignore_failure:
-                                click.echo(click.style(f"Stopping execution of stage '{stage_name}' due to denied approval.", fg="red"))
-                                return
-                    except Exception as e:
-                        click.echo(click.style(f"❌ Error during approval request: {str(e)}", fg="red"))
-                        summary["failed"] += 1
-                        if not ignore_failure:
-                            return
+def _topo_waves(nodes, dependencies):
+    """
+    Group nodes into waves using Kahn's algorithm.
 
-            except Exception as e:
-                click.echo(click.style(f"❌ Error during stage '{stage_name}': {str(e)}", fg="red"))
-                summary["failed"] += 1
+    Args:
+        nodes (list): Node names in their preferred order.
+        dependencies (dict): Maps a node name to the set of node names it depends on.
 
-            click.echo(f"[INFO] ***************** Completed stage: {stage_name} *********************\n")
+    Returns:
+        list: Lists of node names. Every node comes after all of its dependencies,
+        and nodes within one wave keep their preferred order.
+    """
+    order = {node: i for i, node in enumerate(nodes)}
+    indegree = {node: len(dependencies.get(node, ())) for node in nodes}
+    dependents = {node: [] for node in nodes}
+    for node in nodes:
+        for dependency in dependencies.get(node, ()):
+            dependents[dependency].append(node)
+
+    waves = []
+    wave = [node for node in nodes if indegree[node] == 0]
+    while wave:
+        waves.append(wave)
+        ready = []
+        for node in wave:
+            for dependent in dependents[node]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        wave = sorted(ready, key=order.get)
+
+    if sum(len(w) for w in waves) != len(nodes):
+        blocked = [node for node in nodes if indegree[node] > 0]
+        raise ValueError(f"Dependency cycle between: {', '.join(map(str, blocked))}")
+    return waves
+
+def _order_stages(stages):
+    """
+    Order stages so that each one runs after the stages listed in its `depends_on`, which is a
+    stage name or a list of them.
 
-    # Execute jobs or stages
-    if is_jobs:
-        click.echo(f"Executing {len(jobs_or_stages)} jobs in parallel...\n")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(jobs_or_stages)) as executor:
-            futures = [executor.submit(process_single_item, job) for job in jobs_or_stages]
-            concurrent.futures.wait(futures)
-    else:
-        click.echo(f"Executing {len(jobs_or_stages)} stages sequentially...\n")
-        for stage in jobs_or_stages:
-            process_single_item(stage)
+    Among stages that are ready at the same time, those with the most dependents go first,
+    so a failure there stops the build before the work that would have been wasted.
 
-    simulation_thread.join()
+    Args:
+        stages (list): Stage configurations in their configured order.
 
-    click.echo(f"Build process completed. Summary: {summary}")
-    print("=" * 43)
-    print("|      DEVOPS-BOT INFRACYCLE BUILD COMPLETED        |")
-    print("=" * 43)
+    Returns:
+        list: The stages in execution order; unchanged if no stage declares dependencies.
+    """
+    # Stages that aren't mappings are left for process_single_item to report
+    if not any(isinstance(stage, dict) and stage.get("depends_on") for stage in stages):
+        return stages
+
+    names = [stage.get("name", "Unnamed Stage") for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Stage names must be unique when 'depends_on' is used.")
+
+    by_name = dict(zip(names, stages))
+    dependencies = {}
+    dependents = dict.fromkeys(names, 0)
+    for name, stage in by_name.items():
+        depends_on = stage.get("depends_on") or ()
+        if isinstance(depends_on, str):
+            depends_on = (depends_on,)
+        elif not isinstance(depends_on, (list, tuple)) or not all(isinstance(dep, str) for dep in depends_on):
+            raise ValueError(f"Stage '{name}': depends_on must be a stage name or a list of stage names")
+        unknown = [dep for dep in depends_on if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(unknown)}")
+        dependencies[name] = set(depends_on)
+        for dep in dependencies[name]:
+            dependents[dep] += 1
+
+    return [
+        by_name[name]
+        for wave in _topo_waves(names, dependencies)
+        for name in sorted(wave, key=lambda name: -dependents[name])
+    ]
+
+def _report(label, result, summary, ignore_failure, stage_name):
+    """
+    Print the outcome banner for a task and record failures.
+
+    Returns:
+        bool: False if the stage must stop because the task failed, True otherwise.
+    """
+    # Each banner goes out as a single write
+    if result:
+        click.echo(_DONE_BANNERS[label])
+        return True
+
+    _count(summary, "failed")
+    banner = _FAIL_BANNERS[label]
+    if not ignore_failure:
+        click.echo(banner + "\n" + click.style(f"Stopping execution of stage '{stage_name}' due to failure.", fg="red"))
+        return False
+    click.echo(banner + "\n")
+    return True
 
 ###################################
+# Absolute paths of build tools, resolved once per process so each spawn skips the $PATH walk
+_EXE = {}
+
+def _exe(name):
+    """
+    Return the absolute path of a tool, or its bare name if it is not on $PATH (yet).
+    """
+    path = _EXE.get(name)
+    if path is None:
+        path = _EXE[name] = shutil.which(name) or name
+    return path
+
+@functools.lru_cache(maxsize=None)
+def _has(name):
+    """
+    Check whether a tool is on $PATH; answered once per process (clear the cache after installing).
+    """
+    return shutil.which(name) is not None
+
+def _stream_command(command, cwd=None, env=None):
+    """
+    Run a command with its output going straight to the agent's stdout.
+
+    The child inherits our stdout file descriptor (stderr merged into it), so its output
+    never passes through Python.
+
+    Args:
+        command (list): The argument vector to execute.
+        cwd (str): Working directory for the command.
+        env (dict): Environment for the command; defaults to the agent's environment.
+
+    Returns:
+        int: The return code of the command.
+    """
+    sys.stdout.flush()  # Keep our own buffered output ahead of the child's
+    try:
+        return subprocess.call(command, cwd=cwd, env=env, stderr=subprocess.STDOUT)
+    except OSError as e:
+        # Without a shell in between, a missing tool surfaces here instead of as exit code 127
+        click.echo(click.style(f"❌ Failed to run '{command[0]}': {e}", fg="red"))
+        return 127
+
+_TAIL_BYTES = 64 * 1024  # Output kept by _run_streaming for the failure report
+
+def _run_streaming(command, cwd=None, env=None, tail=200):
+    """
+    Run a command, streaming its output (stderr merged) to our stdout in raw 64 KiB chunks
+    while keeping its last bytes for the failure report.
+
+    Args:
+        command (list): The argument vector to execute.
+        cwd (str): Working directory for the command.
+        env (dict): Environment for the command; defaults to the agent's environment.
+        tail (int): How many trailing output lines to report if the command fails.
+
+    Returns:
+        tuple: (int, list) the return code and, if it is non-zero, the last lines of output as
+        bytes; the list is empty on success.
+    """
+    try:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+    except OSError as e:
+        click.echo(click.style(f"❌ Failed to run '{command[0]}': {e}", fg="red"))
+        return 127, []
+
+    sink = _LogSink()
+    fd = process.stdout.fileno()
+    kept = bytearray()  # Output tail, trimmed to _TAIL_BYTES so output without newlines can't grow it
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        sink.write(chunk)
+        kept += chunk
+        if len(kept) > _TAIL_BYTES:
+            del kept[:-_TAIL_BYTES]
+    sink.flush()
+    process.stdout.close()
+
+    returncode = process.wait()
+    if returncode == 0:
+        return returncode, []  # The tail is only reported on failure, so skip splitting it
+    if kept.endswith(b"\n"):
+        del kept[-1:]
+    return returncode, bytes(kept).split(b"\n")[-tail:]
+
+def _echo_tail(lines):
+    """Repeat the last lines of a failed command's output, so they sit right above its error."""
+    if lines:
+        click.echo(click.style(f"--- last {len(lines)} lines of output ---", fg="red"))
+        click.echo(b"\n".join(lines).decode(errors="replace"))
+
+class _LogSink:
+    """
+    Forwards raw child output to our stdout, flushing once per complete line batch or 4 KiB
+    instead of once per read, and never through click's per-call styling and stream lookup.
+    """
+
+    def __init__(self):
+        sys.stdout.flush()  # Keep our own buffered output ahead of the child's
+        self._out = sys.stdout.buffer
+        self._buf = bytearray()
+
+    def write(self, chunk):
+        self._buf += chunk
+        if len(self._buf) >= 4096 or chunk.endswith(b"\n"):
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._out.write(self._buf)
+            self._out.flush()
+            self._buf.clear()
+
 def run_yarn_build(yarn_config, clone_dir, summary):
     """
     Run Yarn build.
@@ -357,37 +599,23 @@ def run_yarn_build(yarn_config, clone_dir, summary):
     click.echo("🚀 Starting Yarn build...")
 
     # Install dependencies
-    yarn_install_command = f"cd {clone_dir} && yarn install"
-    process = subprocess.Popen(yarn_install_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
+    returncode = _stream_command([_exe("yarn"), "install"], cwd=clone_dir)
 
-    process.stdout.close()
-    process.wait()
-
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Failed to install Yarn dependencies.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     # Execute Yarn build
-    yarn_build_command = f"cd {clone_dir} && yarn build"
-    process = subprocess.Popen(yarn_build_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
-
-    process.stdout.close()
-    process.wait()
+    returncode = _stream_command([_exe("yarn"), "build"], cwd=clone_dir)
 
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Yarn build failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ Yarn build completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 def run_sonar_analysis(sonar_config, clone_dir, summary):
     """
@@ -414,34 +642,29 @@ def run_sonar_analysis(sonar_config, clone_dir, summary):
 
     if not all([sonar_url, project_key, sonar_token]):
         click.echo(click.style("❌ SonarQube configuration is incomplete. Skipping analysis.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     # Construct SonarQube command
-    sonar_command = (
-        f"sonar-scanner -Dsonar.projectKey={project_key} "
-        f"-Dsonar.sources={source_dir} "
-        f"-Dsonar.projectBaseDir={source_dir} "
-        f"-Dsonar.host.url={sonar_url} "
-        f"-Dsonar.login={sonar_token}"
-    )
+    sonar_command = [
+        _exe("sonar-scanner"),
+        f"-Dsonar.projectKey={project_key}",
+        f"-Dsonar.sources={source_dir}",
+        f"-Dsonar.projectBaseDir={source_dir}",
+        f"-Dsonar.host.url={sonar_url}",
+        f"-Dsonar.login={sonar_token}",
+    ]
 
     # Execute SonarQube scan
-    process = subprocess.Popen(sonar_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
-
-    process.stdout.close()
-    process.wait()
+    returncode = _stream_command(sonar_command)
 
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ SonarQube analysis failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ SonarQube analysis completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 def run_npm_build(npm_config, clone_dir, summary):
     """
@@ -462,37 +685,23 @@ def run_npm_build(npm_config, clone_dir, summary):
     click.echo("🚀 Starting NPM build...")
 
     # Install dependencies
-    npm_install_command = f"cd {clone_dir} && npm install"
-    process = subprocess.Popen(npm_install_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    returncode = _stream_command([_exe("npm"), "install"], cwd=clone_dir)
 
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
-
-    process.stdout.close()
-    process.wait()
-
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Failed to install npm dependencies.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     # Execute npm build
-    npm_build_command = f"cd {clone_dir} && npm run build"
-    process = subprocess.Popen(npm_build_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    returncode = _stream_command([_exe("npm"), "run", "build"], cwd=clone_dir)
 
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
-
-    process.stdout.close()
-    process.wait()
-
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ NPM build failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ NPM build completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 def run_go_build(go_config, clone_dir, summary):
     """
@@ -512,31 +721,27 @@ def run_go_build(go_config, clone_dir, summary):
 
     click.echo("🚀 Starting Go build...")
 
-    # Initialize Go modules
-    go_mod_init = f"cd {clone_dir} && go mod init"
-    subprocess.run(go_mod_init, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    # Install dependencies
-    go_get_command = f"cd {clone_dir} && go get ./..."
-    subprocess.run(go_get_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    # Let `go build` resolve and record modules itself, using every core (explicit settings win)
+    go_env = {"GOFLAGS": "-mod=mod", "GOMAXPROCS": str(os.cpu_count() or 1), **os.environ}
 
-    # Execute Go build
-    go_build_command = f"cd {clone_dir} && go build -v"
-    process = subprocess.Popen(go_build_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    # Initialize Go modules unless the repository already has them
+    if not os.path.isfile(os.path.join(clone_dir, "go.mod")):
+        subprocess.run([_exe("go"), "mod", "init"], cwd=clone_dir, env=go_env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
 
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
+    # Fetch dependencies up front only when asked to
+    if go_config.get("fetch_deps", False):
+        subprocess.run([_exe("go"), "get", "./..."], cwd=clone_dir, env=go_env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
 
-    process.stdout.close()
-    process.wait()
+    # Execute Go build
+    returncode = _stream_command([_exe("go"), "build", "-v"], cwd=clone_dir, env=go_env)
 
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Go build failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ Go build completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 
 def run_trivy_scan(trivy_config, summary):
@@ -556,27 +761,19 @@ def run_trivy_scan(trivy_config, summary):
     severity = trivy_config.get("severity", "UNKNOWN,LOW,MEDIUM,HIGH,CRITICAL")
 
     # Construct Trivy scan command
-    trivy_scan_command = f"trivy {target_type} {target} --format {output_format} --severity {severity}"
+    trivy_scan_command = [_exe("trivy"), target_type, target, "--format", output_format, "--severity", severity]
 
     click.echo(f"🔍 Running Trivy scan on {target}...")
 
-    process = subprocess.Popen(
-        trivy_scan_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
-
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
-
-    process.stdout.close()
-    process.wait()
+    returncode = _stream_command(trivy_scan_command)
 
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Trivy scan failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ Trivy scan completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 def run_gradle_build(gradle_config, clone_dir, summary):
     """
@@ -598,33 +795,27 @@ def run_gradle_build(gradle_config, clone_dir, summary):
 
     gradle_tasks = gradle_config.get("target", "build")
 
-    # Check if Gradle Wrapper exists
-    check_gradlew_command = f"cd {clone_dir} && [ -f ./gradlew ] && echo 'found' || echo 'missing'"
-    process = subprocess.run(check_gradlew_command, shell=True, capture_output=True, text=True)
+    # Check if an executable Gradle Wrapper exists
+    gradlew = os.path.join(clone_dir, "gradlew")
+    use_wrapper = os.path.isfile(gradlew) and os.access(gradlew, os.X_OK)
 
-    if "missing" in process.stdout:
+    if not use_wrapper:
         click.echo(click.style("⚠️ Gradle Wrapper (gradlew) not found. Using system Gradle.", fg="yellow"))
-        gradle_command = f"cd {clone_dir} && gradle {gradle_tasks} --no-daemon"
+        gradle_command = [_exe("gradle"), *gradle_tasks.split(), "--no-daemon"]
     else:
         click.echo(click.style("✅ Using Gradle Wrapper (gradlew) for the build.", fg="green"))
-        gradle_command = f"cd {clone_dir} && ./gradlew {gradle_tasks} --no-daemon"
+        gradle_command = ["./gradlew", *gradle_tasks.split(), "--no-daemon"]
 
     # Execute Gradle build
-    process = subprocess.Popen(gradle_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
+    returncode = _stream_command(gradle_command, cwd=clone_dir)
 
-    process.stdout.close()
-    process.wait()
-
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Gradle build failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ Gradle build completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 def run_ant_build(ant_config, clone_dir, summary):
     """
@@ -649,90 +840,271 @@ def run_ant_build(ant_config, clone_dir, summary):
     target = ant_config.get("target", "build")
 
     # Construct Ant build command
-    ant_command = f"cd {clone_dir} && ant -f {build_file} {target}"
+    ant_command = [_exe("ant"), "-f", build_file, *target.split()]
 
-    click.echo(f"🔧 Executing Ant build command: {ant_command}")
+    click.echo(f"🔧 Executing Ant build command: {' '.join(ant_command)}")
     
     # Execute the Ant build
-    process = subprocess.Popen(ant_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)
+    returncode = _stream_command(ant_command, cwd=clone_dir)
 
-    process.stdout.close()
-    process.wait()
-
-    if process.returncode != 0:
+    if returncode != 0:
         click.echo(click.style("❌ Ant build failed.", fg="red"))
-        summary["failed"] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style(f"✅ Ant build completed successfully.", fg="green"))
-    summary["completed"] += 1
+    _count(summary, "completed")
     return True
 
+_ARTIFACT_SUFFIXES = frozenset({".jar", ".war"})
+
+def _iter_artifacts(root):
+    """
+    Yield the paths of build artifacts below root, without following symlinks.
+
+    DirEntry caches the file type from readdir(), so this needs no stat() per entry.
+    """
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_artifacts(entry.path)
+        elif entry.is_file(follow_symlinks=False) and os.path.splitext(entry.name)[1] in _ARTIFACT_SUFFIXES:
+            yield entry.path
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class MavenConfig:
+    """A maven task's settings, with the mvn arguments assembled once."""
+    enabled: bool
+    project_pom: str
+    goals: tuple
+    profile_option: tuple
+    output_dir: str
+    args: tuple  # Everything after the mvn executable
+    needs: tuple = None  # Task keys to wait for, overriding the registry's order
+
+    @classmethod
+    def from_dict(cls, maven_config):
+        project_pom = maven_config.get("project_pom", "pom.xml")
+        goals = tuple(maven_config.get("goals", "clean install").split())
+        profiles = maven_config.get("profiles", "")
+        profile_option = (f"-P{profiles}",) if profiles else ()
+        return cls(
+            enabled=bool(maven_config.get("enabled")),
+            project_pom=project_pom,
+            goals=goals,
+            profile_option=profile_option,
+            output_dir=maven_config.get("output_dir", "/tmp/maven_artifacts"),
+            args=("-f", project_pom, *goals, *profile_option, "--batch-mode"),
+            needs=_task_needs(maven_config),
+        )
+
 def run_maven_build(maven_config, clone_dir, summary):
     """
     Run Maven build inside the Build Agent container.
 
     Args:
-        maven_config (dict): Configuration dictionary for Maven build.
+        maven_config (MavenConfig | dict): Configuration for the Maven build.
         clone_dir (str): The directory containing the source code.
         summary (dict): A dictionary to track the task results.
 
     Returns:
         bool: True if the Maven build was successful, False otherwise.
     """
-    if not maven_config.get("enabled"):
+    if isinstance(maven_config, dict):
+        maven_config = MavenConfig.from_dict(maven_config)
+    if not maven_config.enabled:
         click.echo(click.style("⚠️ Maven build is not enabled; skipping this step.", fg="yellow"))
         return False
 
     click.echo("🚀 Starting Maven build...")
 
-    # Maven-specific configuration values
-    project_pom = maven_config.get("project_pom", "pom.xml")
-    maven_goals = maven_config.get("goals", "clean install")
-    profiles = maven_config.get("profiles", "")
-    profile_option = f"-P{profiles}" if profiles else ""
-    output_dir = maven_config.get("output_dir", "/tmp/maven_artifacts")
+    output_dir = maven_config.output_dir
 
     # Ensure the artifact directory exists
     os.makedirs(output_dir, exist_ok=True)
 
     # Construct Maven build command
-    maven_build_command = f"cd {clone_dir} && mvn -f {project_pom} {maven_goals} {profile_option} --batch-mode"
+    maven_build_command = [_exe("mvn"), *maven_config.args]
 
     # Execute Maven build command with real-time output
-    click.echo(f"🔧 Executing: `{maven_build_command}`")
-    process = subprocess.Popen(
-        maven_build_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
-
-    for line in iter(process.stdout.readline, ''):
-        click.echo(line, nl=False)  # Stream Maven output live
+    click.echo(f"🔧 Executing: `{shlex.join(maven_build_command)}` in {clone_dir}")
+    returncode, tail = _run_streaming(maven_build_command, cwd=clone_dir)  # Stream Maven output live
 
-    process.stdout.close()
-    process.wait()
-
-    if process.returncode != 0:
+    if returncode != 0:
+        _echo_tail(tail)
         click.echo(click.style("❌ Maven build failed.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(click.style("✅ Maven build completed successfully.", fg="green"))
 
     # Move artifacts to the specified output directory
-    move_artifacts_command = f"find {clone_dir}/target -type f -name '*.jar' -o -name '*.war' -exec mv {{}} {output_dir} \\;"
-    subprocess.run(move_artifacts_command, shell=True, check=True)
+    for path in _iter_artifacts(os.path.join(clone_dir, "target")):
+        dest = os.path.join(output_dir, os.path.basename(path))
+        try:
+            os.replace(path, dest)  # A single rename(2) on the same filesystem
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(path, dest)
 
     click.echo(click.style(f"📦 Artifacts moved to {output_dir}.", fg="green"))
-    summary['completed'] += 1
+    _count(summary, "completed")
     return True
 def request_approval(task_name):
     # Prompt user for approval
     approval = click.prompt(f"Approval required for task '{task_name}'. Do you want to proceed? [y/N]", default='n')
     return approval.lower() == 'y'
 
+def run_approval_request(approval_config, stage_name, summary):
+    """
+    Ask for approval before the stage carries on.
+
+    Args:
+        approval_config (dict): Configuration dictionary for the approval request.
+        stage_name (str): Name of the stage, used when no task name is configured.
+        summary (dict): A dictionary to track the task results.
+
+    Returns:
+        bool: True if the task was approved, False otherwise.
+    """
+    approved = request_approval(approval_config.get("task_name", stage_name))
+    if approved:
+        _count(summary, "completed")
+    return approved
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class EmailConfig:
+    """SMTP settings of a notification, read and checked once."""
+    smtp_server: str
+    smtp_port: int
+    sender_email: str
+    sender_password: str = dataclasses.field(repr=False)
+
+    @classmethod
+    def from_dict(cls, email_config):
+        return cls(
+            smtp_server=email_config.get('smtp_server'),
+            smtp_port=email_config.get('smtp_port'),
+            sender_email=email_config.get('sender_email'),
+            sender_password=email_config.get('sender_password'),
+        )
+
+    @property
+    def complete(self):
+        return bool(self.smtp_server and self.smtp_port and self.sender_email and self.sender_password)
+
+    @property
+    def pool_key(self):
+        return (self.smtp_server, self.smtp_port, self.sender_email)
+
+# Authenticated SMTP connections reused across notifications:
+# (smtp_server, smtp_port, sender_email) -> [connection, messages sent on it]
+_SMTP_POOL = {}
+_SMTP_LOCK = threading.Lock()
+_SMTP_MAX_SENDS = 1000  # Reconnect after this many messages, as many providers cap a session
+_SMTP_TIMEOUT = 30  # Seconds any SMTP connect, read or write may take before the send fails
+
+def _get_smtp(email_config):
+    """
+    Return a live pool entry for the given SMTP settings, connecting and logging in on a miss.
+
+    Must be called with _SMTP_LOCK held.
+    """
+    import smtplib
+
+    key = email_config.pool_key
+    entry = _SMTP_POOL.get(key)
+    if entry is not None:
+        try:
+            healthy = entry[1] < _SMTP_MAX_SENDS and entry[0].noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            _SMTP_POOL.pop(key)[0].close()  # Broken or silent: don't wait on a QUIT reply
+            entry = None
+        else:
+            if not healthy:
+                _close_smtp(_SMTP_POOL.pop(key)[0])
+                entry = None
+
+    if entry is None:
+        server = smtplib.SMTP(key[0], key[1], timeout=_SMTP_TIMEOUT)
+        try:
+            server.starttls()
+            server.login(key[2], email_config.sender_password)
+        except Exception:
+            _close_smtp(server)
+            raise
+        entry = _SMTP_POOL[key] = [server, 0]
+    return entry
+
+def _smtp_send(email_config, recipients, message):
+    """
+    Send an email.message.EmailMessage, or an already rendered message as bytes, over the pooled
+    connection for the given SMTP settings.
+
+    If the server dropped the connection since the last health check, reconnect and try once more.
+    """
+    import smtplib
+
+    with _SMTP_LOCK:
+        for attempt in range(2):
+            entry = _get_smtp(email_config)
+            try:
+                if isinstance(message, bytes):
+                    entry[0].sendmail(email_config.sender_email, recipients, message)
+                else:
+                    entry[0].send_message(message, email_config.sender_email, recipients)
+            except Exception as e:
+                # Don't hand a connection in an unknown state to the next notification
+                _SMTP_POOL.pop(email_config.pool_key, None)
+                if isinstance(e, OSError):
+                    entry[0].close()  # Includes socket timeouts; a QUIT would wait just as long
+                else:
+                    _close_smtp(entry[0])
+                if attempt == 0 and isinstance(e, smtplib.SMTPServerDisconnected):
+                    continue
+                raise
+            entry[1] += 1
+            return
+
+def _close_smtp(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+def _close_smtp_pool():
+    """Log out of every pooled SMTP connection."""
+    # The mail thread may still be stuck in a send the flush gave up on; don't wait on it forever
+    if not _SMTP_LOCK.acquire(timeout=_SMTP_TIMEOUT):
+        return
+    try:
+        while _SMTP_POOL:
+            _close_smtp(_SMTP_POOL.popitem()[1][0])
+    finally:
+        _SMTP_LOCK.release()
+
+atexit.register(_close_smtp_pool)
+
+# Notification mail for values that need no MIME encoding (see _is_plain_header)
+_NOTIFICATION_TEMPLATE = (
+    "From: {sender}\r\n"
+    "To: {to}\r\n"
+    "Subject: Task {task} - {status}\r\n"
+    "MIME-Version: 1.0\r\n"
+    "Content-Type: text/plain; charset=\"us-ascii\"\r\n"
+    "Content-Transfer-Encoding: 7bit\r\n"
+    "\r\n"
+    "The task '{task}' has completed with status: {status}.\r\n"
+)
+
+def _is_plain_header(value):
+    """Tell whether a value can go into a header verbatim: printable ASCII that keeps lines short."""
+    return isinstance(value, str) and len(value) <= 200 and value.isascii() and value.isprintable()
+
 def send_email_notification(task_name, status, recipients, email_config):
     """
     Send an email notification.
@@ -741,48 +1113,59 @@ def send_email_notification(task_name, status, recipients, email_config):
         task_name (str): The name of the task.
         status (str): The task status (e.g., success, failure).
         recipients (list): List of recipient email addresses.
-        email_config (dict): Email configuration containing SMTP details.
+        email_config (EmailConfig | dict): Email configuration containing SMTP details.
 
     Returns:
         bool: True if email was sent successfully, False otherwise.
     """
-    smtp_server = email_config.get('smtp_server')
-    smtp_port = email_config.get('smtp_port')
-    sender_email = email_config.get('sender_email')
-    sender_password = email_config.get('sender_password')
+    if isinstance(email_config, dict):
+        email_config = EmailConfig.from_dict(email_config)
+    sender_email = email_config.sender_email
 
-    if not (smtp_server and smtp_port and sender_email and sender_password):
+    if not email_config.complete:
         click.echo(click.style("❌ Incomplete email configuration. Please provide SMTP details.", fg="red"))
         return False
 
-    subject = f"Task {task_name} - {status}"
-    body = f"The task '{task_name}' has completed with status: {status}."
+    to = ', '.join(recipients)
+    if all(_is_plain_header(value) for value in (sender_email, to, task_name, status)):
+        # Everything is short 7-bit text, so the message is rendered without building MIME objects
+        msg = _NOTIFICATION_TEMPLATE.format(sender=sender_email, to=to, task=task_name, status=status).encode("ascii")
+    else:
+        # Non-ASCII or unusual values need RFC 2047 headers and a charset; let the email package do that
+        from email.message import EmailMessage
+
+        subject = f"Task {task_name} - {status}"
+        body = f"The task '{task_name}' has completed with status: {status}."
 
-    msg = MIMEMultipart()
-    msg['From'] = sender_email
-    msg['To'] = ', '.join(recipients)
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
+        # A single text/plain part; a multipart wrapper would only add a boundary around it
+        msg = EmailMessage()
+        msg['From'] = sender_email
+        msg['To'] = to
+        msg['Subject'] = subject
+        msg.set_content(body)
 
     try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipients, msg.as_string())
-            click.echo(click.style(f"✅ Email notification sent to: {', '.join(recipients)}", fg="green"))
+        _smtp_send(email_config, recipients, msg)
+        click.echo(click.style(f"✅ Email notification sent to: {', '.join(recipients)}", fg="green"))
         return True
     except Exception as e:
         click.echo(click.style(f"❌ Failed to send email: {e}", fg="red"))
         return False
+# When each (task_name, status, recipients) notification last went out, so that a repeat
+# within _NOTIFY_DEDUP_SECONDS (e.g. the same stage running in several jobs) is not sent again
+_NOTIFY_SENT = {}
+_NOTIFY_LOCK = threading.Lock()
+_NOTIFY_DEDUP_SECONDS = 60
+
 def notify_on_task_completion(task_name, status, recipients=None, email_config=None):
     """
-    Notify users via email.
+    Notify users via email, skipping a notification identical to one sent within the last minute.
 
     Args:
         task_name (str): The task name.
         status (str): The task status (success, failure).
         recipients (list): List of email recipients.
-        email_config (dict): SMTP email configuration.
+        email_config (EmailConfig | dict): SMTP email configuration.
 
     Returns:
         bool: True if notification was sent successfully, False otherwise.
@@ -791,18 +1174,117 @@ def notify_on_task_completion(task_name, status, recipients=None, email_config=N
         click.echo(click.style("❌ Email configuration or recipients are missing in config.", fg="red"))
         return False
 
+    key = (task_name, status, tuple(recipients))
+    with _NOTIFY_LOCK:
+        sent_at = _NOTIFY_SENT.get(key)
+    if sent_at is not None and time.monotonic() - sent_at < _NOTIFY_DEDUP_SECONDS:
+        click.echo(f"📨 Notification for '{task_name}' ({status}) was just sent; deduplicated.")
+        return True
+
     try:
-        return send_email_notification(task_name, status, recipients, email_config)
+        sent = send_email_notification(task_name, status, recipients, email_config)
     except Exception as e:
         click.echo(click.style(f"❌ Notification failed: {e}", fg="red"))
         return False
+    if sent:
+        with _NOTIFY_LOCK:
+            _NOTIFY_SENT[key] = time.monotonic()
+    return sent
+
+# Notifications are sent by one background thread, so builds don't wait on SMTP round trips.
+# Items are (notify_on_task_completion args, summary to record the outcome in).
+_MAIL_QUEUE = queue.Queue()
+_MAIL_WORKER = None
+_MAIL_WORKER_LOCK = threading.Lock()
+_FLUSH_TIMEOUT = 120  # Seconds a flush waits for the mail thread before giving up on the rest
+
+def _mail_worker():
+    while True:
+        args, summary = _MAIL_QUEUE.get()
+        try:
+            _count(summary, "completed" if notify_on_task_completion(*args) else "failed")
+        except Exception as e:
+            click.echo(click.style(f"❌ Notification failed: {e}", fg="red"))
+            _count(summary, "failed")
+        finally:
+            _MAIL_QUEUE.task_done()
+
+def _queue_notification(args, summary):
+    """
+    Hand a notification to the mail thread, starting it on first use.
+    """
+    global _MAIL_WORKER
+    with _MAIL_WORKER_LOCK:
+        if _MAIL_WORKER is None:
+            _MAIL_WORKER = threading.Thread(target=_mail_worker, name="infracycle-mail", daemon=True)
+            _MAIL_WORKER.start()
+    _MAIL_QUEUE.put((args, summary))
+
+def _flush_notifications(timeout=_FLUSH_TIMEOUT):
+    """
+    Wait until every queued notification has been sent (or has failed), for at most timeout
+    seconds. Notifications still queued after that are dropped, logged and counted as failed.
+    """
+    if _MAIL_WORKER is None:
+        return
+    deadline = time.monotonic() + timeout
+    with _MAIL_QUEUE.all_tasks_done:
+        while _MAIL_QUEUE.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _MAIL_QUEUE.all_tasks_done.wait(remaining)
+        else:
+            return
+
+    # Whatever the mail thread hasn't picked up yet will not be sent
+    while True:
+        try:
+            args, summary = _MAIL_QUEUE.get_nowait()
+        except queue.Empty:
+            break
+        click.echo(click.style(f"❌ Notification for task '{args[0]}' was not sent within {timeout}s; dropped.", fg="red"))
+        _count(summary, "failed")
+        _MAIL_QUEUE.task_done()
+
+# Registered after _close_smtp_pool, so it runs first: drain the queue, then log out
+atexit.register(_flush_notifications)
+
+def run_notification(notification_config, stage_name, summary):
+    """
+    Queue the email notification configured for a stage.
+
+    The message is sent in the background; its outcome is recorded in summary once it
+    has gone out, at the latest when the build finishes.
+
+    Args:
+        notification_config (dict): Configuration dictionary for the notification.
+        stage_name (str): Name of the stage, used when no task name is configured.
+        summary (dict): A dictionary to track the task results.
+
+    Returns:
+        bool: True if the notification was queued, False if it is missing its configuration.
+    """
+    recipients = notification_config.get("recipients", [])
+    email_config = notification_config.get("email_config", {})
+    if not recipients or not email_config:
+        click.echo(click.style("❌ Email configuration or recipients are missing in config.", fg="red"))
+        return False
+
+    task_name = notification_config.get("task_name", stage_name)
+    _queue_notification(
+        (task_name, notification_config.get("status", "success"), recipients, email_config), summary
+    )
+    click.echo(f"📨 Notification for '{task_name}' queued.")
+    return True
        
-def run_shell_steps(sh_config, summary):
+def run_shell_steps(sh_config, shells, summary):
     """
     Execute custom shell commands inside the container.
 
     Args:
         sh_config (dict): Configuration dictionary for shell steps.
+        shells (dict): The job's shell sessions (see _session_shell).
         summary (dict): A dictionary to track the task results.
 
     Returns:
@@ -818,26 +1300,29 @@ def run_shell_steps(sh_config, summary):
         click.echo(click.style("⚠️ No shell commands provided; skipping.", fg="yellow"))
         return False
 
+    # All steps share the job's sh process (and its cwd/environment)
+    shell = _session_shell(shells, "sh")
     for i, command in enumerate(steps, start=1):
         click.echo(click.style(f"🔧 Executing Shell step {i}/{len(steps)}: {command}", fg="blue"))
 
-        success, message = execute_command_locally(command, real_time_output=True)
+        returncode = shell.run(command)
 
-        if success:
+        if returncode == 0:
             click.echo(click.style(f"✅ Step {i} executed successfully.", fg="green"))
-            summary['completed'] += 1
+            _count(summary, "completed")
         else:
-            click.echo(click.style(f"❌ Step {i} failed: {message}", fg="red"))
-            summary['failed'] += 1
+            click.echo(click.style(f"❌ Step {i} failed: Command failed with return code {returncode}.", fg="red"))
+            _count(summary, "failed")
             return False
 
     return True
-def run_bash_steps(bash_config, summary):
+def run_bash_steps(bash_config, shells, summary):
     """
     Execute custom Bash commands inside the container.
 
     Args:
         bash_config (dict): Configuration dictionary for Bash steps.
+        shells (dict): The job's shell sessions (see _session_shell).
         summary (dict): A dictionary to track the task results.
 
     Returns:
@@ -853,21 +1338,120 @@ def run_bash_steps(bash_config, summary):
         click.echo(click.style("⚠️ No Bash commands provided; skipping.", fg="yellow"))
         return False
 
+    # All steps share the job's bash process (and its cwd/environment)
+    shell = _session_shell(shells, "bash")
     for i, command in enumerate(steps, start=1):
         click.echo(click.style(f"🔧 Executing Bash step {i}/{len(steps)}: {command}", fg="blue"))
 
-        success, message = execute_command_locally(command, real_time_output=True)
+        returncode = shell.run(command)
 
-        if success:
+        if returncode == 0:
             click.echo(click.style(f"✅ Step {i} executed successfully.", fg="green"))
-            summary['completed'] += 1
+            _count(summary, "completed")
         else:
-            click.echo(click.style(f"❌ Step {i} failed: {message}", fg="red"))
-            summary['failed'] += 1
+            click.echo(click.style(f"❌ Step {i} failed: Command failed with return code {returncode}.", fg="red"))
+            _count(summary, "failed")
             return False
 
     return True
 
+def _session_shell(shells, name):
+    """
+    Return the session's shell of the given kind ("sh" or "bash"), starting it on first use.
+
+    A session lives for one job (or one run of sequential stages), so its shell steps
+    share a single process across stages.
+    """
+    shell = shells.get(name)
+    if shell is None:
+        shell = shells[name] = PersistentShell([name])
+    return shell
+
+def _close_shells(shells):
+    """Let every shell of a session exit."""
+    while shells:
+        shells.popitem()[1].close()
+
+class PersistentShell:
+    """
+    A long-lived shell that runs commands one after another, so a series of steps costs a
+    single shell start-up and later steps see the cwd and variables left by earlier ones.
+    """
+
+    def __init__(self, argv):
+        """
+        Args:
+            argv (list): Command line of the shell, e.g. ["bash"].
+        """
+        self.argv = argv
+        self.marker = f"__DBS_END_{os.urandom(16).hex()}__".encode()
+        self.process = None
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+
+    def run(self, command):
+        """
+        Run a command in the shell, echoing its output as it arrives.
+
+        Args:
+            command (str): The shell command to execute.
+
+        Returns:
+            int: The exit status of the command.
+        """
+        # A previous command may have ended the shell (e.g. `exit`); carry on in a fresh one
+        if self.process is None or self.process.poll() is not None:
+            self.close()
+            self._start()
+
+        # eval keeps a malformed command from swallowing the lines after it, and /dev/null keeps
+        # the command from reading them; the marker line then reports the exit status.
+        self.process.stdin.write(
+            f"eval {shlex.quote(command)} < /dev/null\nprintf '%s %d\\n' {self.marker.decode()} \"$?\"\n".encode()
+        )
+        self.process.stdin.flush()
+
+        # Pass output through in chunks, holding back just enough to spot a marker split across reads
+        sink = _LogSink()
+        fd = self.process.stdout.fileno()
+        keep = len(self.marker) - 1
+        pending = bytearray()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                # The shell exited before reporting back
+                sink.write(pending)
+                sink.flush()
+                return self.process.wait()
+            pending += chunk
+
+            end = pending.find(self.marker)
+            if end == -1:
+                if len(pending) > keep:
+                    sink.write(pending[:-keep])
+                    del pending[:-keep]
+                continue
+            newline = pending.find(b"\n", end)
+            if newline == -1:
+                continue  # The status line is still on its way
+
+            output = pending[:end]
+            if output and not output.endswith(b"\n"):
+                output += b"\n"  # Output that didn't end with a newline
+            sink.write(output)
+            sink.flush()
+            return int(pending[end + len(self.marker):newline])
+
+    def close(self):
+        """Let the shell exit and reap it."""
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.stdout.close()
+            self.process.wait()
+
 def execute_command_locally(command, real_time_output=False):
     """
     Execute a shell command locally inside the container.
@@ -881,83 +1465,102 @@ def execute_command_locally(command, real_time_output=False):
     """
     try:
         if real_time_output:
-            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            for line in iter(process.stdout.readline, ''):
-                click.echo(line, nl=False)
-            process.stdout.close()
-            process.wait()
-            if process.returncode == 0:
+            returncode, tail = _run_streaming(["/bin/sh", "-c", command])
+            if returncode == 0:
                 return True, "Command executed successfully."
             else:
-                return False, f"Command failed with return code {process.returncode}."
+                return False, f"Command failed with return code {returncode}.\n" + b"\n".join(tail).decode(errors="replace")
         else:
             result = subprocess.run(command, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
             return True, result.stdout
     except subprocess.CalledProcessError as e:
         return False, str(e)
 
+@dataclasses.dataclass(frozen=True, slots=True)
+class DockerHubConfig:
+    """A docker_hub task's settings, with the target image name formatted once."""
+    enabled: bool
+    username: str
+    password: str = dataclasses.field(repr=False)
+    repository: str
+    built_image_name: str
+    image_tag: str
+    full_image_name: str
+    needs: tuple = None  # Task keys to wait for, overriding the registry's order
+
+    @classmethod
+    def from_dict(cls, docker_hub):
+        username = docker_hub.get("username")
+        repository = docker_hub.get("repository")
+        image_tag = docker_hub.get("image_tag", "latest")
+        return cls(
+            enabled=bool(docker_hub.get("enabled")),
+            username=username,
+            password=docker_hub.get("password"),
+            repository=repository,
+            built_image_name=docker_hub.get("built_image_name"),
+            image_tag=image_tag,
+            full_image_name=f"{username}/{repository}:{image_tag}",
+            needs=_task_needs(docker_hub),
+        )
+
 def push_to_docker_hub(docker_hub, summary):
     """
     Push the Docker image to Docker Hub.
 
     Args:
-        docker_hub (dict): Contains Docker Hub credentials, repository info, and built image name.
+        docker_hub (DockerHubConfig | dict): Docker Hub credentials, repository info, and built image name.
         summary (dict): A dictionary to track the task results.
 
     Returns:
         bool: True if the push to Docker Hub was successful, False otherwise.
     """
-    docker_username = docker_hub.get("username")
-    docker_password = docker_hub.get("password")
-    repository_name = docker_hub.get("repository")
-    built_image_name = docker_hub.get("built_image_name")
-    image_tag = docker_hub.get("image_tag", "latest")
-    full_image_name = f"{docker_username}/{repository_name}:{image_tag}"
+    if isinstance(docker_hub, dict):
+        docker_hub = DockerHubConfig.from_dict(docker_hub)
+    docker_username = docker_hub.username
+    docker_password = docker_hub.password
+    built_image_name = docker_hub.built_image_name
+    full_image_name = docker_hub.full_image_name
 
     if not built_image_name:
         click.echo(click.style("❌ Built image name is missing in the configuration. Aborting Docker Hub push.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return False
 
     click.echo(f"📦 Preparing to push Docker image '{full_image_name}' to Docker Hub...")
 
     # Step 1: Ensure Docker is installed
-    try:
-        subprocess.run(["docker", "--version"], check=True, capture_output=True, text=True)
+    if _has("docker"):
         click.echo("✅ Docker is already installed.")
-    except subprocess.CalledProcessError:
+    else:
         click.echo(click.style("⚠️ Docker is not installed. Installing Docker...", fg="yellow"))
-        subprocess.run("apt-get update && apt-get install -y docker.io", shell=True, check=True)
+        _apt_install("docker.io")
 
     # Step 2: Log in to Docker Hub
-    click.echo("🔑 Logging in to Docker Hub...")
-    try:
-        login_command = f"echo {docker_password} | docker login -u {docker_username} --password-stdin"
-        subprocess.run(login_command, shell=True, check=True)
-    except subprocess.CalledProcessError:
-        click.echo(click.style("❌ Failed to log in to Docker Hub.", fg="red"))
-        summary['failed'] += 1
+    if not _docker_login(docker_username, docker_password):
+        _count(summary, "failed")
         return False
 
     # Step 3: Tag the Docker image
     click.echo(f"🏷️ Tagging Docker image '{built_image_name}' as '{full_image_name}'...")
     try:
-        subprocess.run(f"docker tag {built_image_name} {full_image_name}", shell=True, check=True)
-    except subprocess.CalledProcessError:
+        subprocess.run([_exe("docker"), "tag", built_image_name, full_image_name], check=True)
+    except (OSError, subprocess.CalledProcessError):
         click.echo(click.style("❌ Failed to tag Docker image.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return False
 
     # Step 4: Push the Docker image
     click.echo(f"🚀 Pushing Docker image '{full_image_name}' to Docker Hub...")
-    try:
-        subprocess.run(f"docker push {full_image_name}", shell=True, check=True)
+    returncode, tail = _run_streaming([_exe("docker"), "push", full_image_name])
+    if returncode == 0:
         click.echo(click.style(f"✅ Docker image '{full_image_name}' pushed successfully.", fg="green"))
-        summary['completed'] += 1
+        _count(summary, "completed")
         return True
-    except subprocess.CalledProcessError:
+    else:
+        _echo_tail(tail)
         click.echo(click.style("❌ Failed to push Docker image to Docker Hub.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return False
 def check_docker_installation():
     """
@@ -967,25 +1570,100 @@ def check_docker_installation():
     Returns:
         bool: True if Docker is installed, False otherwise.
     """
-    try:
-        subprocess.run(["docker", "--version"], check=True, capture_output=True, text=True)
+    if _has("docker"):
         click.echo(click.style("✅ Docker is already installed.", fg="green"))
         return True
-    except subprocess.CalledProcessError:
-        click.echo(click.style("⚠️ Docker not found. Installing Docker...", fg="yellow"))
-        install_docker()
-        return False
+
+    click.echo(click.style("⚠️ Docker not found. Installing Docker...", fg="yellow"))
+    install_docker()
+    return False
 
 def install_docker():
     """
     Install Docker inside the container using apt.
     """
     try:
-        subprocess.run("apt-get update && apt-get install -y docker.io", shell=True, check=True)
+        _apt_install("docker.io")
         click.echo(click.style("✅ Docker installed successfully.", fg="green"))
     except subprocess.CalledProcessError as e:
         click.echo(click.style(f"❌ Failed to install Docker: {e}", fg="red"))
 
+def _apt_install(package):
+    """
+    Install a package with apt-get and forget cached tool lookups so the new binary is found.
+    """
+    subprocess.run(["apt-get", "update"], check=True)
+    subprocess.run(["apt-get", "install", "-y", package], check=True)
+    _has.cache_clear()
+    _has_buildx.cache_clear()
+    _buildx_version.cache_clear()
+    _buildx_driver.cache_clear()
+    _EXE.clear()
+
+@functools.lru_cache(maxsize=None)
+def _has_buildx():
+    """
+    Check once whether the Docker CLI has the BuildKit 'buildx' plugin.
+    """
+    try:
+        return subprocess.run([_exe("docker"), "buildx", "version"], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+@functools.lru_cache(maxsize=None)
+def _buildx_version():
+    """
+    Return the buildx plugin's version as a tuple of ints (e.g. (0, 13, 1)), or None if it can't
+    be determined.
+    """
+    try:
+        result = subprocess.run([_exe("docker"), "buildx", "version"], capture_output=True, text=True)
+    except OSError:
+        return None
+    # e.g. "github.com/docker/buildx v0.13.1 788433953af10f2a698f5c07611dddce2e08c7a0"
+    for word in result.stdout.split():
+        parts = word.lstrip("v").split("-")[0].split(".")
+        if word.startswith("v") and len(parts) >= 2 and all(part.isdigit() for part in parts):
+            return tuple(int(part) for part in parts)
+    return None
+
+@functools.lru_cache(maxsize=None)
+def _buildx_driver():
+    """
+    Return the driver of the current buildx builder (e.g. "docker", "docker-container"), or None
+    if it can't be determined.
+    """
+    try:
+        result = subprocess.run([_exe("docker"), "buildx", "inspect"], capture_output=True, text=True)
+    except OSError:
+        return None
+    for line in result.stdout.splitlines():
+        name, _, value = line.partition(":")
+        if name.strip() == "Driver":
+            return value.strip()
+    return None
+
+def _docker_login(username, password):
+    """
+    Log in to Docker Hub, handing the password over on stdin so it never reaches a shell or argv.
+
+    Returns:
+        bool: True if the login succeeded, False otherwise.
+    """
+    click.echo("🔑 Logging in to Docker Hub...")
+    try:
+        subprocess.run([_exe("docker"), "login", "-u", username, "--password-stdin"],
+                       input=(password or "").encode(), check=True, capture_output=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        click.echo(click.style("❌ Failed to log in to Docker Hub.", fg="red"))
+        if e.stderr:
+            click.echo(e.stderr.decode(errors="replace").rstrip())
+        return False
+    except OSError as e:
+        click.echo(click.style(f"❌ Failed to log in to Docker Hub: {e}", fg="red"))
+        return False
+
 def docker_build(task, clone_dir, summary):
     """
     Perform a Docker build process inside the container.
@@ -1012,26 +1690,93 @@ def docker_build(task, clone_dir, summary):
     build_tag = task.get("build_tag", "latest")
     image_name = task.get("image_name", "docker_image")
     built_image_name = f"{image_name}:{build_tag}"
-
-    # Build Docker image
-    docker_build_command = f"docker build -t {built_image_name} -f {dockerfile_path} {clone_dir}"
+    push = task.get("push") or {}
+    if push and not _has_buildx():
+        click.echo(click.style("⚠️ docker buildx is not available; building without pushing.", fg="yellow"))
+        push = {}
+
+    # Build Docker image; with push credentials BuildKit uploads layers while later ones still build.
+    # The image is loaded locally as well (pulled back on buildx before 0.13, which refuses --push
+    # with --load) and tagged image_name:build_tag afterwards, so trivy and docker_hub tasks find it
+    # under the same name as for a build without push.
+    local_image_name = built_image_name
+    load_with_push = False
+    if push:
+        if not push.get("username") or not push.get("password") or not push.get("repository"):
+            click.echo(click.style("❌ Docker build push is missing username, password or repository.", fg="red"))
+            _count(summary, "failed")
+            return False
+        built_image_name = f"{push['username']}/{push['repository']}:{push.get('image_tag', build_tag)}"
+        if not _docker_login(push["username"], push["password"]):
+            _count(summary, "failed")
+            return False
+        load_with_push = (_buildx_version() or (0,)) >= (0, 13)
+        docker_build_command = [_exe("docker"), "buildx", "build", "--push"]
+        if load_with_push:
+            docker_build_command.append("--load")
+    elif _has_buildx():
+        docker_build_command = [_exe("docker"), "buildx", "build", "--load"]
+    else:
+        docker_build_command = [_exe("docker"), "build"]
+
+    if _has_buildx():
+        docker_build_command.append("--progress=plain")  # One line per step, readable in CI logs
+        # Reuse layers from earlier runs; exporting a registry or local cache needs a non-default
+        # (docker-container) builder, e.g. one created with 'docker buildx create --use'
+        cache_ref = task.get("cache_ref")
+        if cache_ref:
+            docker_build_command.append(f"--cache-from=type=registry,ref={cache_ref}")
+            if _buildx_driver() == "docker":
+                click.echo(click.style(
+                    "⚠️ The default 'docker' buildx driver can't export a cache; "
+                    f"reading '{cache_ref}' without updating it.", fg="yellow"))
+            else:
+                docker_build_command.append(f"--cache-to=type=registry,ref={cache_ref},mode=max")
+        elif task.get("local_cache"):
+            if _buildx_driver() == "docker":
+                click.echo(click.style(
+                    "⚠️ The default 'docker' buildx driver can't use a local cache; building without it.", fg="yellow"))
+            else:
+                # One cache per image, so layers survive edits to the Dockerfile
+                cache_dir = os.path.join(_CACHE_DIR, "buildx", hashlib.sha256(image_name.encode()).hexdigest()[:16])
+                docker_build_command += [
+                    f"--cache-from=type=local,src={cache_dir}",
+                    f"--cache-to=type=local,dest={cache_dir},mode=max",
+                ]
+    docker_build_command += ["-t", built_image_name, "-f", dockerfile_path, clone_dir]
     click.echo(f"📦 Building Docker image '{built_image_name}' using Dockerfile at '{dockerfile_path}'...")
 
-    try:
-        subprocess.run(docker_build_command, shell=True, check=True)
-        click.echo(click.style(f"✅ Docker image '{built_image_name}' built successfully.", fg="green"))
-        summary['completed'] += 1
+    returncode, tail = _run_streaming(docker_build_command)
+    if returncode == 0:
+        if push:
+            click.echo(click.style(f"✅ Docker image '{built_image_name}' built and pushed successfully.", fg="green"))
+            # A second -t on the build would be pushed too, so the local name is added afterwards
+            try:
+                if not load_with_push:
+                    click.echo(f"📥 Pulling '{built_image_name}' back for later tasks...")
+                    subprocess.run([_exe("docker"), "pull", "--quiet", built_image_name], check=True)
+                subprocess.run([_exe("docker"), "tag", built_image_name, local_image_name], check=True)
+            except (OSError, subprocess.CalledProcessError):
+                click.echo(click.style(
+                    f"⚠️ Failed to make the image available locally as '{local_image_name}'; "
+                    f"later tasks must use the pushed image '{built_image_name}'.", fg="yellow"))
+        else:
+            click.echo(click.style(f"✅ Docker image '{built_image_name}' built successfully.", fg="green"))
+        _count(summary, "completed")
         return True
-    except subprocess.CalledProcessError:
+    else:
+        _echo_tail(tail)
         click.echo(click.style(f"❌ Failed to build Docker image.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return False
 def setup_and_clone_repository(tasks, summary):
     """
     Set up a directory and clone one or more branches of a repository inside the container.
 
     Args:
-        tasks (dict): Task configuration containing 'clone_dir', 'source_url', 'branches', 'private_repo', 'username', and 'token'.
+        tasks (dict): Task configuration containing 'clone_dir', 'source_url', 'branches', 'private_repo', 'username', 'token',
+                      'full_clone' (fetch full history even for a single branch), and 'worktrees' (check each
+                      additional branch out into its own '<clone_dir>-<branch>' worktree instead of clone_dir).
         summary (dict): A dictionary to track the task results.
 
     Returns:
@@ -1043,30 +1788,32 @@ def setup_and_clone_repository(tasks, summary):
     private_repo = tasks.get("private_repo", False)
     username = tasks.get("username", "")
     token = tasks.get("token", "")
+    full_clone = tasks.get("full_clone", False)
+    worktrees = tasks.get("worktrees", False)
+    shallow = not full_clone and (len(branches) == 1 or worktrees)
 
     if not source_url:
         click.echo(click.style("❌ No source URL provided for repository cloning.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return None
 
     # Step 1: Ensure Git is installed inside the container
-    try:
-        subprocess.run(["git", "--version"], check=True, capture_output=True, text=True)
+    if _has("git"):
         click.echo("✅ Git is already installed.")
-    except subprocess.CalledProcessError:
+    else:
         click.echo(click.style("❌ Git is not installed in the container. Installing Git...", fg="yellow"))
-        subprocess.run("apt-get update && apt-get install -y git", shell=True, check=True)
+        _apt_install("git")
 
     # Step 2: Prepare the directory
     click.echo(f"📁 Preparing {clone_dir} and cloning repository into it...")
-    clear_and_create_command = f"rm -rf {clone_dir} && mkdir -p {clone_dir}"
-    subprocess.run(clear_and_create_command, shell=True, check=True)
+    shutil.rmtree(clone_dir, ignore_errors=True)
+    os.makedirs(clone_dir, exist_ok=True)
 
     # Step 3: Handle private repository authentication if necessary
     if private_repo:
         if not username or not token:
             click.echo(click.style("❌ Private repository credentials not provided.", fg="red"))
-            summary['failed'] += 1
+            _count(summary, "failed")
             return None
         # Construct the HTTPS URL with credentials
         protocol, repo_path = source_url.split("://", 1)
@@ -1074,33 +1821,126 @@ def setup_and_clone_repository(tasks, summary):
 
     # Step 4: Clone the first branch directly into clone_dir
     first_branch = branches[0]
-    clone_command = f"git clone --branch {first_branch} {source_url} {clone_dir}"
+    clone_command = [_exe("git"), "clone", "--branch", first_branch]
+    if shallow:
+        # Each checkout only needs its branch tip; skip history and delta resolution
+        clone_command += ["--depth=1", "--single-branch"]
+    clone_command += [source_url, clone_dir]
     try:
-        subprocess.run(clone_command, shell=True, check=True)
+        subprocess.run(clone_command, check=True)
         click.echo(click.style(f"✅ Branch '{first_branch}' successfully cloned into {clone_dir}.", fg="green"))
-        summary['completed'] += 1
+        _count(summary, "completed")
     except subprocess.CalledProcessError:
         click.echo(click.style(f"❌ Failed to clone branch '{first_branch}'.", fg="red"))
-        summary['failed'] += 1
+        _count(summary, "failed")
         return None
 
-    # Step 5: Checkout additional branches if specified
+    # Step 5: Checkout additional branches if specified, fetching them all in one round trip
     if len(branches) > 1:
-        subprocess.run(f"cd {clone_dir} && git fetch", shell=True, check=True)
+        git = [_exe("git"), "-C", clone_dir]
+        refspecs = [f"+refs/heads/{branch}:refs/remotes/origin/{branch}" for branch in branches[1:]]
+        depth = ["--depth=1"] if shallow else []
+        subprocess.run(git + ["fetch", "--no-tags", *depth, "origin", *refspecs], check=True)
 
         for branch in branches[1:]:
-            checkout_command = f"cd {clone_dir} && git checkout {branch}"
             try:
-                subprocess.run(checkout_command, shell=True, check=True)
-                click.echo(click.style(f"✅ Branch '{branch}' checked out in {clone_dir}.", fg="green"))
-                summary['completed'] += 1
+                if worktrees:
+                    # A sibling worktree shares the object store and leaves clone_dir on the first branch
+                    target_dir = f"{clone_dir.rstrip('/')}-{branch.replace('/', '-')}"
+                    shutil.rmtree(target_dir, ignore_errors=True)
+                    subprocess.run(git + ["worktree", "add", "-B", branch, target_dir, f"origin/{branch}"], check=True)
+                else:
+                    target_dir = clone_dir
+                    subprocess.run(git + ["checkout", branch], check=True)
+                click.echo(click.style(f"✅ Branch '{branch}' checked out in {target_dir}.", fg="green"))
+                _count(summary, "completed")
             except subprocess.CalledProcessError:
                 click.echo(click.style(f"❌ Failed to check out branch '{branch}'.", fg="red"))
-                summary['failed'] += 1
+                _count(summary, "failed")
                 return None
 
     return clone_dir
 
+# Task registry: (config key, runner, banner label, options), in preferred execution order.
+# "requires"/"produces" name the resources a task reads and creates; tasks of a stage whose
+# requirements are met run concurrently. "workspace" is the checked-out tree: every task that
+# writes to it requires and produces it, so those run one at a time in registry order. The
+# notification waits for every task that can still fail the stage, so it never reports a
+# success the stage doesn't reach.
+TASKS = [
+    ("setup_and_clone", setup_and_clone_repository, "SETUP AND CLONING",
+     {"returns_clone_dir": True, "produces": {"clone_dir"}}),
+    ("docker_build", docker_build, "DOCKER BUILD",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "workspace"}, "produces": {"image", "workspace"}}),
+    ("docker_hub", push_to_docker_hub, "DOCKER HUB PROCESS",
+     {"requires": {"image"}, "produces": {"published"}}),
+    ("sh", run_shell_steps, "SHELL SCRIPT EXECUTION",
+     {"needs_shells": True, "requires": {"clone_dir", "workspace"}, "produces": {"workspace"}}),
+    ("bash", run_bash_steps, "BASH SCRIPT EXECUTION",
+     {"needs_shells": True, "requires": {"clone_dir", "workspace"}, "produces": {"workspace"}}),
+    ("maven", run_maven_build, "MAVEN BUILD",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "workspace"}, "produces": {"artifacts", "workspace"}}),
+    ("send_notification", run_notification, "EMAIL NOTIFICATION",
+     {"needs_stage_name": True, "requires": {"image", "published", "workspace", "artifacts", "scan"},
+      "produces": {"notified"}}),
+    ("gradle", run_gradle_build, "GRADLE BUILD",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "workspace"}, "produces": {"artifacts", "workspace"}}),
+    ("trivy", run_trivy_scan, "TRIVY SCANNING",
+     {"requires": {"clone_dir", "image", "workspace"}, "produces": {"scan"}}),
+    ("yarn", run_yarn_build, "YARN BUILD",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "workspace"}, "produces": {"artifacts", "workspace"}}),
+    ("go_build", run_go_build, "GO BUILD",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "workspace"}, "produces": {"artifacts", "workspace"}}),
+    ("npm", run_npm_build, "NPM BUILD",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "workspace"}, "produces": {"artifacts", "workspace"}}),
+    ("sonarqube_analysis", run_sonar_analysis, "SONARQUBE ANALYSIS",
+     {"needs_clone_dir": True, "requires": {"clone_dir", "artifacts", "workspace"}, "produces": {"scan"}}),
+    ("request_approval", run_approval_request, "APPROVAL REQUEST",
+     {"needs_stage_name": True,
+      "requires": {"clone_dir", "image", "published", "workspace", "artifacts", "notified", "scan"}}),
+]
+
+_TASK_KEYS = frozenset(key for key, _, _, _ in TASKS)
+
+# Task banners, formatted (and styled) once per label instead of on every task
+_ENABLED_BANNERS = {
+    label: f"************************ {label} ENABLED *******************************" for _, _, label, _ in TASKS
+}
+_DONE_BANNERS = {
+    label: f"✅ *********************** {label} COMPLETED SUCCESSFULLY **************************\n"
+    for _, _, label, _ in TASKS
+}
+_FAIL_BANNERS = {
+    label: click.style(f"❌ *********************** {label} FAILED **************************", fg="red")
+    for _, _, label, _ in TASKS
+}
+
+def prepare_configs(config):
+    """
+    Swap the maven, docker_hub and notification email blocks of every stage for their
+    immutable, prepared form, so runs read attributes instead of re-parsing dicts.
+
+    Args:
+        config (dict): The loaded configuration; updated in place.
+
+    Returns:
+        dict: The same configuration.
+    """
+    stages = list(config.get("stages") or [])
+    for job in config.get("jobs") or []:
+        stages.extend(job.get("stages") or [])
+
+    for stage in stages:
+        tasks = stage.get("tasks") or {}
+        if isinstance(tasks.get("maven"), dict):
+            tasks["maven"] = MavenConfig.from_dict(tasks["maven"])
+        if isinstance(tasks.get("docker_hub"), dict):
+            tasks["docker_hub"] = DockerHubConfig.from_dict(tasks["docker_hub"])
+        notification = tasks.get("send_notification")
+        if isinstance(notification, dict) and notification.get("email_config"):
+            notification["email_config"] = EmailConfig.from_dict(notification["email_config"])
+    return config
+
 #######################################
 def main():
     """Main execution function for the Build Agent."""
@@ -1110,12 +1950,14 @@ def main():
     if not config:
         print("❌ No valid config. Exiting.")
         return
+    prepare_configs(config)
 
     # Extract jobs and execute them
     jobs = config.get("jobs", None)
     if jobs:
         print("🚀 Executing jobs from config...")
-        execute_build_stages(jobs, is_jobs=True)
+        # job_executor: "process" runs jobs in worker processes instead of threads
+        execute_build_stages(jobs, is_jobs=True, use_processes=config.get("job_executor") == "process")
 
     print("🏁 Build Agent Execution Complete!")
 